@@ -1,24 +1,39 @@
 import os
+import asyncio
 import gradio as gr
 import google.generativeai as genai
 from datetime import datetime
 import random
+import re
 import uuid
+from collections import OrderedDict, deque
 from pathlib import Path
+from dotenv import load_dotenv
+
+# Load the environment before utils.auth reads its secrets
+load_dotenv()
+
 from utils.auth import check_password, create_token, verify_token
 from utils.document_processor import DocumentProcessor
 from utils.db_handler import DatabaseHandler
-from dotenv import load_dotenv
+from utils.response_cache import SemanticCache
 
-# Initialize components
-load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-
-genai.configure(api_key=GEMINI_API_KEY)
-doc_processor = DocumentProcessor(GEMINI_API_KEY)
-db_handler = DatabaseHandler()
+# Created in main(); PDF worker processes import this module and must not open the store or build the UI
+doc_processor = None
+db_handler = None
+model = None
+response_cache = SemanticCache(threshold=0.97, max_entries=256)
+query_embedding_cache = OrderedDict()
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+# Upper bound on concurrent chat requests in flight to Gemini, shared by all users
+GEMINI_MAX_INFLIGHT = int(os.getenv("GEMINI_MAX_INFLIGHT", "8"))
+gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_INFLIGHT)
+warmed_up = False
+DOCUMENTS_PAGE_SIZE = 5  # Rows shown per page in the admin document table
+CHAT_CONTEXT_MESSAGES = 4  # Previous messages included in the prompt
+MAX_CONTEXT_CHARS = 8000  # Budget for retrieved text sent to Gemini on each turn
+GREETING_RE = re.compile(r"\s*(?:hello|hi|hey|greetings|namaste)\b", re.IGNORECASE)  # Matched at the start only
 
 # Configure Gemini model
 generation_config = {
@@ -35,307 +50,63 @@ safety_settings = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
 ]
 
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash-8b",
-    generation_config=generation_config,
-    safety_settings=safety_settings
-)
-
-# Clean, minimalistic CSS with mobile-friendly design
-custom_css = """
-:root {
-    --primary-color: #4f46e5;
-    --background-color: #ffffff;
-    --text-color: #2d3748;
-    --border-color: #e2e8f0;
-    --accent-color: #8b5cf6;
-}
-
-#app-container {
-    max-width: 1000px;
-    margin: 1rem auto;
-    padding: 0 0.75rem;
-    width: 100%;
-    box-sizing: border-box;
-}
-
-@media (max-width: 768px) {
-    #app-container {
-        margin: 0.5rem auto;
-        padding: 0 0.5rem;
-    }
-}
-
-.header {
-    margin-bottom: 1.5rem;
-    text-align: center;
-    color: var(--text-color);
-    animation: fadeIn 0.5s ease-in;
-    padding: 0 0.5rem;
-}
+# Chat prompt; chat_context, context and message are filled in on every turn
+PROMPT_TEMPLATE = """You are the friendly and enthusiastic LPU AI Assistant. You love LPU and are incredibly proud of the university's achievements. Remember to:
 
-.header h1 {
-    font-size: clamp(1.5rem, 5vw, 2.5rem);
-    font-weight: 600;
-    margin-bottom: 0.5rem;
-    background: linear-gradient(120deg, var(--primary-color), var(--accent-color));
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    line-height: 1.2;
-    padding: 0 0.5rem;
-    word-wrap: break-word;
-}
-
-.header p {
-    color: #4a5568;
-    font-size: clamp(0.9rem, 3vw, 1.1rem);
-    padding: 0 0.5rem;
-}
-
-.chat-interface {
-    border: 1px solid var(--border-color);
-    border-radius: 12px;
-    padding: 1rem;
-    background: var(--background-color);
-    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
-    margin: 0 0.25rem;
-    width: 100%;
-    box-sizing: border-box;
-}
-
-@media (max-width: 768px) {
-    .chat-interface {
-        padding: 0.5rem;
-        border-radius: 8px;
-        margin: 0;
-    }
-}
-
-.message-bot {
-    background: #f8f7ff !important;
-    padding: 0.75rem !important;
-    border-radius: 12px 12px 12px 0 !important;
-    border: 1px solid #e4e2ff !important;
-    margin: 0.5rem 0 !important;
-    transition: all 0.2s ease;
-    font-size: 0.95rem !important;
-    word-wrap: break-word !important;
-    max-width: 100% !important;
-    box-sizing: border-box !important;
-}
-
-.message-user {
-    background: #ebf8ff !important;
-    padding: 0.75rem !important;
-    border-radius: 12px 12px 0 12px !important;
-    border: 1px solid #bee3f8 !important;
-    margin: 0.5rem 0 !important;
-    transition: all 0.2s ease;
-    font-size: 0.95rem !important;
-    word-wrap: break-word !important;
-    max-width: 100% !important;
-    box-sizing: border-box !important;
-}
-
-@media (max-width: 768px) {
-    .message-bot,
-    .message-user {
-        padding: 0.625rem !important;
-        font-size: 0.9rem !important;
-        margin: 0.375rem 0 !important;
-    }
-}
-
-.admin-panel {
-    padding: 1rem;
-    border-radius: 12px;
-    background: #f8f7ff;
-    border: 1px solid var(--border-color);
-    margin: 0.5rem 0.25rem;
-    width: 100%;
-    box-sizing: border-box;
-}
-
-@media (max-width: 768px) {
-    .admin-panel {
-        padding: 0.75rem;
-        border-radius: 8px;
-        margin: 0.5rem 0;
-    }
-    
-    .admin-panel input[type="text"],
-    .admin-panel input[type="password"] {
-        font-size: 16px !important;
-    }
-}
-
-.input-row {
-    display: flex;
-    gap: 0.5rem;
-    margin-top: 0.75rem;
-    width: 100%;
-    box-sizing: border-box;
-}
-
-@media (max-width: 768px) {
-    .input-row {
-        gap: 0.375rem;
-        margin-top: 0.5rem;
-        flex-direction: column;
-    }
-    
-    .input-row > * {
-        width: 100% !important;
-        margin: 0.25rem 0;
-    }
-}
-
-button.primary-btn {
-    background: linear-gradient(120deg, var(--primary-color), var(--accent-color)) !important;
-    color: white !important;
-    border-radius: 8px !important;
-    padding: 0.75rem 1rem !important;
-    font-size: 0.9rem !important;
-    transition: all 0.2s ease !important;
-    border: none !important;
-    cursor: pointer !important;
-    min-height: 40px !important;
-}
-
-@media (max-width: 768px) {
-    button.primary-btn {
-        width: 100% !important;
-        padding: 0.625rem 0.75rem !important;
-        font-size: 0.85rem !important;
-    }
-}
-
-button.primary-btn:hover {
-    transform: translateY(-1px) !important;
-    box-shadow: 0 4px 12px rgba(79, 70, 229, 0.2) !important;
-}
-
-@media (hover: none) {
-    button.primary-btn:hover {
-        transform: none !important;
-    }
-}
-
-.footer {
-    margin-top: 1.5rem;
-    padding: 1rem 0.5rem;
-    border-top: 1px solid var(--border-color);
-    text-align: center;
-    font-size: clamp(0.8rem, 2.5vw, 0.95rem);
-    color: #718096;
-    width: 100%;
-    box-sizing: border-box;
-}
-
-.clear-btn {
-    margin-top: 0.5rem;
-    width: 100%;
-    padding: 0.5rem !important;
-    font-size: 0.9rem;
-    opacity: 0.9;
-    transition: all 0.2s ease;
-}
-
-.chat-window {
-    margin-bottom: 1rem;
-    padding: 0.75rem;
-    max-height: 70vh !important;
-    overflow-y: auto !important;
-}
-
-@media (max-width: 768px) {
-    .chat-window {
-        padding: 0.5rem;
-        max-height: 60vh !important;
-    }
-}
-
-.source-citation {
-    font-size: clamp(0.75rem, 2.5vw, 0.875rem);
-    color: #718096;
-    border-top: 1px solid var(--border-color);
-    margin-top: 0.5rem;
-    padding: 0.5rem;
-    word-wrap: break-word;
-}
+        - Be warm and engaging while maintaining professionalism
+        - Share information Professionally and use data to support your responses , facts and highlight important things.
+        - Always use Data driven responses.
+        - You are colleges rag bot , queries not realted to your domian should be ignored like coding or genreal questions you should simply decline it.
+        - Highlight LPU's strengths and achievements with pride
+        - If discussing challenges, frame them as opportunities for growth
+        - Share relatable examples and success stories when relevant
+        - Always be encouraging and supportive
+        - Include specific details that showcase LPU's excellence
 
-.document-row {
-    display: flex;
-    align-items: center;
-    padding: 0.5rem;
-    border-bottom: 1px solid var(--border-color);
-    flex-wrap: wrap;
-}
+        Previous Messages:
+        {chat_context}
 
-@media (max-width: 768px) {
-    .document-row {
-        flex-direction: column;
-        align-items: flex-start;
-        gap: 0.375rem;
-        padding: 0.75rem 0.5rem;
-    }
-}
+        Context:
+        {context}
 
-.document-info {
-    flex: 1;
-    min-width: 0;
-    word-wrap: break-word;
-}
+        Question: {message}
 
-.document-actions {
-    display: flex;
-    gap: 0.5rem;
-    flex-wrap: wrap;
-}
+        Respond in a way that makes the user feel Satisfied of its questions. Balance friendliness with informative content with data and facts with professionalism."""
 
-@media (max-width: 768px) {
-    .document-actions {
-        width: 100%;
-    }
-    
-    .document-actions button {
-        width: 100%;
-    }
-}
+# Canned replies, built once at import
+GREETINGS = (
+    "Namaste! I'm your friendly LPU companion! I'd love to tell you all about our amazing university. What would you like to know? 😊",
+    "Hi there! Welcome to LPU's virtual family! I'm here to share exciting things about our wonderful campus. What interests you? 🎓",
+    "Hey! I'm thrilled to connect with you! LPU is an incredible place of learning and growth. How can I help you explore it? ✨",
+)
+NO_RESULTS_REPLIES = (
+    "I'm still learning about that aspect of LPU! Our university is so vast and wonderful that there's always something new to discover. Could you ask me about another exciting aspect of LPU? 🌟",
+    "While I continue enhancing my knowledge about our fantastic university, maybe I can tell you about other amazing things at LPU? What else interests you? 🎯",
+    "I'm currently expanding my understanding of that topic! LPU has so many remarkable features - would you like to explore something else about our prestigious institution? 🌈",
+)
+ENGAGEMENT_PHRASES = (
+    "\n\nIs there anything specific about this that you'd like to explore further? 🤔",
+    "\n\nI'm excited to share more about LPU's excellence! What aspect interests you most? ✨",
+    "\n\nThis is just one of the many amazing things about LPU! Would you like to know more? 🌟",
+)
 
-@keyframes fadeIn {
-    from {
-        opacity: 0;
-        transform: translateY(-10px);
-    }
-    to {
-        opacity: 1;
-        transform: translateY(0);
-    }
-}
+# Clean, minimalistic CSS with mobile-friendly design, served as a cacheable static file
+STATIC_DIR = Path(__file__).parent / "static"
+stylesheet_link = f'<link rel="stylesheet" href="/gradio_api/file={STATIC_DIR / "app.css"}">'
 
-/* Additional Mobile Optimizations */
-@media (max-width: 768px) {
-    .gradio-container {
-        margin: 0 !important;
-        padding: 0 !important;
-    }
-    
-    .tabs {
-        padding: 0.25rem !important;
-    }
-    
-    .tab-nav {
-        padding: 0.25rem !important;
-        gap: 0.25rem !important;
-    }
-    
-    .tab-nav button {
-        padding: 0.5rem !important;
-        font-size: 0.9rem !important;
-    }
-}
-"""
+async def warm_up():
+    """Prime the Gemini connections once so the first real question skips the cold start"""
+    global warmed_up
+    if warmed_up or os.getenv("WARMUP", "1") != "1":
+        return
+    warmed_up = True
+    try:
+        await asyncio.gather(
+            model.generate_content_async("warmup", generation_config={"max_output_tokens": 1}),
+            doc_processor.get_embeddings_async("warmup", use_cache=False)
+        )
+    except Exception as e:
+        print(f"Error warming up Gemini: {e}")
 
 def admin_login(username, password):
     """Handle admin login"""
@@ -343,265 +114,323 @@ def admin_login(username, password):
         return create_token(), gr.update(visible=True), gr.update(visible=False)
     return None, gr.update(visible=False), gr.update(visible=True)
 
-def process_file(file, token):
+async def process_file(file, token):
     """Process uploaded file and store in database"""
     if not verify_token(token):
-        return "Invalid token. Please log in again.", None
+        return "Invalid token. Please log in again."
     
     try:
         if not file:
-            return "No file selected.", None
+            return "No file selected."
             
         file_path = file.name
         file_type = Path(file_path).suffix[1:].lower()
         if file_type not in ["pdf", "txt", "json", "md"]:
-            return "Let's try with a PDF, TXT, JSON, or MD file to enhance our knowledge base! 📚", None
+            return "Let's try with a PDF, TXT, JSON, or MD file to enhance our knowledge base! 📚"
 
-        text = doc_processor.extract_text(file_path, file_type)
-        embeddings = doc_processor.get_embeddings(text)
+        text = await asyncio.to_thread(doc_processor.extract_text, file_path, file_type)
+        if not text.strip():
+            return "I couldn't find any text in that document. Let's try another file! 📚"
+        chunks, embeddings = await doc_processor.get_embeddings_async(text)
+        if not len(chunks):
+            # Every embedding request failed; a document without chunks could never be found
+            return "I couldn't process that document right now. Let's try again in a moment! 🌟"
 
         document_id = str(uuid.uuid4())
+        upload_date = datetime.now()
         metadata = {
             "filename": Path(file_path).name,
             "file_type": file_type,
-            "upload_date": datetime.now().isoformat()
+            "upload_date": upload_date.isoformat(),
+            "display_date": upload_date.strftime("%Y-%m-%d %H:%M")
         }
 
-        if db_handler.add_document(document_id, text, embeddings, metadata):
-            updated_list = [[doc['filename'], doc['file_type'], 
-                           doc['upload_date'][:16].replace('T', ' '), 
-                           "🗑️ Delete"] 
-                          for doc in db_handler.list_documents()]
-            return f"✨ Successfully added {Path(file_path).name} to our knowledge base! Thank you for helping me learn more about LPU!", updated_list
-        return "I encountered a small challenge while storing the document. Let's try again! 🌟", None
+        if await asyncio.to_thread(db_handler.add_document, document_id, text, chunks, embeddings, metadata):
+            response_cache.clear()
+            return f"✨ Successfully added {Path(file_path).name} to our knowledge base! Thank you for helping me learn more about LPU!"
+        return "I encountered a small challenge while storing the document. Let's try again! 🌟"
 
     except Exception as e:
-        return f"A learning opportunity arose! Let's try that again. Error details: {str(e)} 🔄", None
+        return f"A learning opportunity arose! Let's try that again. Error details: {str(e)} 🔄"
+
+def document_table(page=1):
+    """Build one page of admin document table rows and the matching document ids"""
+    page = max(int(page or 1), 1)
+    page_docs = db_handler.list_documents(limit=DOCUMENTS_PAGE_SIZE, offset=(page - 1) * DOCUMENTS_PAGE_SIZE)
+    rows = [[doc['filename'], doc['file_type'] + (" ⚠️ upload again" if doc['needs_reupload'] else ""), doc['display_date'], "🗑️ Delete"]
+            for doc in page_docs]
+    return rows, [doc['id'] for doc in page_docs]
 
-def delete_document(evt: gr.SelectData, token, documents):
+def delete_document(evt: gr.SelectData, token, documents, document_ids, page):
     """Delete a document when its delete button is clicked"""
     if not verify_token(token):
-        return "Invalid token. Please log in again.", None
+        return "Invalid token. Please log in again.", None, []
     
     try:
-        if evt.column != 3:
-            return None, documents
+        row, column = evt.index
+        if column != 3:
+            return None, documents, document_ids
             
-        doc_to_delete = documents[evt.index]
-        filename = doc_to_delete[0]
-        
-        all_docs = db_handler.list_documents()
-        doc_id = next((doc['id'] for doc in all_docs if doc['filename'] == filename), None)
+        filename = documents[row][0]
+        doc_id = document_ids[row] if row < len(document_ids) else None
         
         if not doc_id:
-            return "I couldn't find that document in my records. Let's try something else! ✨", documents
+            return "I couldn't find that document in my records. Let's try something else! ✨", documents, document_ids
             
         if db_handler.delete_document(doc_id):
-            updated_list = [[doc['filename'], doc['file_type'], 
-                           doc['upload_date'][:16].replace('T', ' '), 
-                           "🗑️ Delete"] 
-                          for doc in db_handler.list_documents()]
-            return f"✨ {filename} has been successfully removed from our collection!", updated_list
-        return "I encountered a small challenge while removing the document. Let's try again! 🌟", documents
+            response_cache.clear()
+            updated_list, updated_ids = document_table(page)
+            return f"✨ {filename} has been successfully removed from our collection!", updated_list, updated_ids
+        return "I encountered a small challenge while removing the document. Let's try again! 🌟", documents, document_ids
     except Exception as e:
-        return f"A learning opportunity arose! Let's try that again. Error details: {str(e)} 🔄", documents
+        return f"A learning opportunity arose! Let's try that again. Error details: {str(e)} 🔄", documents, document_ids
+
+def _truncate_join(texts, max_chars, separator="\n"):
+    """Join texts in order, cutting off the tail once max_chars is reached"""
+    parts = []
+    remaining = max_chars
+    for text in texts:
+        if remaining <= 0:
+            break
+        parts.append(text[:remaining])
+        remaining -= len(parts[-1]) + len(separator)
+    return separator.join(parts)
 
 def format_sources(results):
-    """Format source citations"""
-    sources = []
+    """Format source citations, once per document"""
+    sources = {}
     for result in results:
         filename = result.get('metadata', {}).get('filename', 'Our Knowledge Base')
-        sources.append(f"- {filename}")
-    return "\n".join(sources)
-
-def chat(message, history):
-    """Handle user chat interactions"""
+        sources.setdefault(result.get('id'), f"- {filename}")
+    return "\n".join(sources.values())
+
+async def _embed_query(message):
+    """Return the embedding for a user query, memoized so repeat questions skip the Gemini call, or None if it fails"""
+    key = message.strip().lower()
+    if key in query_embedding_cache:
+        query_embedding_cache.move_to_end(key)
+        return query_embedding_cache[key]
+
+    # Only the cache key is normalized; case carries meaning in names and acronyms, so embed the message as typed.
+    # Queries have the in-memory LRU above; the disk cache is for uploaded documents
+    _, embeddings = await doc_processor.get_embeddings_async(message, use_cache=False)
+    if not len(embeddings):
+        return None
+    embedding = embeddings[0]
+    query_embedding_cache[key] = embedding
+    if len(query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+        query_embedding_cache.popitem(last=False)
+    return embedding
+
+async def chat(message, recent_messages):
+    """Handle user chat interactions, yielding the response as it is generated"""
     try:
-        message_lower = message.lower()
-        is_greeting = any(greeting in message_lower for greeting in ["hello", "hi", "hey", "greetings", "namaste"])
+        is_greeting = GREETING_RE.match(message) is not None
         
-        if is_greeting and not history:
-            greetings = [
-                "Namaste! I'm your friendly LPU companion! I'd love to tell you all about our amazing university. What would you like to know? 😊",
-                "Hi there! Welcome to LPU's virtual family! I'm here to share exciting things about our wonderful campus. What interests you? 🎓",
-                "Hey! I'm thrilled to connect with you! LPU is an incredible place of learning and growth. How can I help you explore it? ✨"
-            ]
-            return random.choice(greetings), ""
-
-        chat_history = []
-        if history:
-            for msg in history:
-                if isinstance(msg, dict):
-                    chat_history.append(f"{msg['role']}: {msg['content']}")
-
-        query_embedding = doc_processor.get_embeddings(message)[0]
-        results = db_handler.query_similar(query_embedding)
+        if is_greeting and not recent_messages:
+            yield random.choice(GREETINGS)
+            return
+
+        chat_context = "\n".join(recent_messages)
+
+        # Clients that skip the page load (e.g. the API) reach Gemini cold, so prime the chat model while
+        # the query embeds; once warmed up this adds nothing
+        query_embedding, _ = await asyncio.gather(_embed_query(message), warm_up())
+        if query_embedding is None:
+            yield "I couldn't quite catch that question just now. Please try asking again in a moment! 🌟"
+            return
+        cached_response = response_cache.get(query_embedding)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+        results = await asyncio.to_thread(db_handler.query_similar, query_embedding)
         
         if not results:
-            alternatives = [
-                "I'm still learning about that aspect of LPU! Our university is so vast and wonderful that there's always something new to discover. Could you ask me about another exciting aspect of LPU? 🌟",
-                "While I continue enhancing my knowledge about our fantastic university, maybe I can tell you about other amazing things at LPU? What else interests you? 🎯",
-                "I'm currently expanding my understanding of that topic! LPU has so many remarkable features - would you like to explore something else about our prestigious institution? 🌈"
-            ]
-            return random.choice(alternatives), ""
-
-        context = "\n".join([result['text'] for result in results])
+            yield random.choice(NO_RESULTS_REPLIES)
+            return
+
+        context = _truncate_join((result['text'] for result in results), max_chars=MAX_CONTEXT_CHARS)
         sources = format_sources(results)
         
-        chat_context = "\n".join(chat_history[-4:]) if chat_history else ""
-        prompt = f"""You are the friendly and enthusiastic LPU AI Assistant. You love LPU and are incredibly proud of the university's achievements. Remember to:
+        prompt = PROMPT_TEMPLATE.format_map({"chat_context": chat_context, "context": context, "message": message})
 
-        - Be warm and engaging while maintaining professionalism
-        - Share information Professionally and use data to support your responses , facts and highlight important things.
-        - Always use Data driven responses.
-        - You are colleges rag bot , queries not realted to your domian should be ignored like coding or genreal questions you should simply decline it.
-        - Highlight LPU's strengths and achievements with pride
-        - If discussing challenges, frame them as opportunities for growth
-        - Share relatable examples and success stories when relevant
-        - Always be encouraging and supportive
-        - Include specific details that showcase LPU's excellence
-
-        Previous Messages:
-        {chat_context}
-
-        Context:
-        {context}
+        response = ""
+        async with gemini_semaphore:
+            async for chunk in await model.generate_content_async(prompt, stream=True):
+                response += chunk.text
+                yield response
 
-        Question: {message}
-
-        Respond in a way that makes the user feel Satisfied of its questions. Balance friendliness with informative content with data and facts with professionalism."""
-
-        response = model.generate_content(prompt).text
-
-        engagement_phrases = [
-            "\n\nIs there anything specific about this that you'd like to explore further? 🤔",
-            "\n\nI'm excited to share more about LPU's excellence! What aspect interests you most? ✨",
-            "\n\nThis is just one of the many amazing things about LPU! Would you like to know more? 🌟"
-        ]
-        
-        response_with_sources = f"{response}{random.choice(engagement_phrases)}\n\n<div class='source-citation'>Sources:\n{sources}</div>"
+        response_with_sources = f"{response}{random.choice(ENGAGEMENT_PHRASES)}\n\n<div class='source-citation'>Sources:\n{sources}</div>"
+        response_cache.add(query_embedding, response_with_sources)
         
-        return response_with_sources, ""
+        yield response_with_sources
 
     except Exception as e:
-        return "I'm Still learning my devloper Raj is still building me. At LPU, we believe in continuous improvement. Please try again, and I'll be happy to assist you! 🌟", ""
-
-def user_message(message, history):
-    """Handle user message submission"""
-    response, _ = chat(message, history)
-    history = history or []
-    history.append({"role": "user", "content": message})
-    history.append({"role": "assistant", "content": response})
-    return "", history
-
-# Create Gradio interface
-with gr.Blocks(css=custom_css, theme=gr.themes.Base()) as app:
-    with gr.Column(elem_id="app-container"):
-        gr.HTML("""
-            <div class="header">
-                <h1>Welcome to Your LPU Friend! 🎓</h1>
-                <p>Let's explore the wonderful world of Lovely Professional University together! ✨</p>
-            </div>
-        """)
-
-        token_state = gr.State("")
-
-        with gr.Tab("Chat"):
-            with gr.Column(elem_classes="chat-interface"):
-                chatbot = gr.Chatbot(
-                    value=None,
-                    label=None,
-                    elem_classes=["message-bot", "message-user"],
-                    height=450,
-                    avatar_images=("https://th.bing.com/th/id/OIP.WIECMJRJhIIAmbZGxVJddwHaGv?rs=1&pid=ImgDetMain", "https://th.bing.com/th/id/OIP.kpO_asrAGtH-pUBQyHiv5AHaE8?rs=1&pid=ImgDetMain"),
-                    show_copy_button=True,
-                    type="messages",
-                )
-                with gr.Row(elem_classes="input-row"):
-                    txt = gr.Textbox(
-                        placeholder="Share your thoughts or questions about LPU! 💭",
-                        scale=8,
-                        show_label=False,
-                        container=False
+        yield "I'm Still learning my devloper Raj is still building me. At LPU, we believe in continuous improvement. Please try again, and I'll be happy to assist you! 🌟"
+
+async def user_message(message, history, recent_messages):
+    """Handle user message submission, streaming the reply into the chat window"""
+    history = (history or []) + [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": ""}
+    ]
+    async for response in chat(message, recent_messages):
+        history[-1]["content"] = response
+        yield "", history, recent_messages
+
+    # Keep only the last few messages for the prompt instead of rescanning the whole history
+    recent_messages.append(f"user: {message}")
+    recent_messages.append(f"assistant: {history[-1]['content']}")
+    yield "", history, recent_messages
+
+def build_app():
+    """Create the Gradio interface"""
+    gr.set_static_paths(paths=[STATIC_DIR])
+    with gr.Blocks(head=stylesheet_link, theme=gr.themes.Base()) as app:
+        with gr.Column(elem_id="app-container"):
+            gr.HTML("""
+                <div class="header">
+                    <h1>Welcome to Your LPU Friend! 🎓</h1>
+                    <p>Let's explore the wonderful world of Lovely Professional University together! ✨</p>
+                </div>
+            """)
+
+            token_state = gr.State("")
+            recent_messages_state = gr.State(deque(maxlen=CHAT_CONTEXT_MESSAGES))
+            document_ids_state = gr.State([])
+
+            with gr.Tab("Chat"):
+                with gr.Column(elem_classes="chat-interface"):
+                    chatbot = gr.Chatbot(
+                        value=None,
+                        label=None,
+                        elem_classes=["message-bot", "message-user"],
+                        height=450,
+                        avatar_images=("https://th.bing.com/th/id/OIP.WIECMJRJhIIAmbZGxVJddwHaGv?rs=1&pid=ImgDetMain", "https://th.bing.com/th/id/OIP.kpO_asrAGtH-pUBQyHiv5AHaE8?rs=1&pid=ImgDetMain"),
+                        show_copy_button=True,
+                        type="messages",
                     )
-                    submit_btn = gr.Button("Let's Chat! 💫", elem_classes="primary-btn", scale=1)
-                clear_btn = gr.Button("Start Fresh ✨", size="sm", elem_classes="clear-btn")
-
-        with gr.Tab("Admin"):
-            with gr.Column(elem_classes="admin-panel") as login_column:
-                username = gr.Textbox(label="Username", placeholder="Enter your username ✨")
-                password = gr.Textbox(label="Password", type="password", placeholder="Enter your password 🔒")
-                login_button = gr.Button("Log In ✨", elem_classes="primary-btn")
-                login_error = gr.Markdown(visible=False, value="Let's try those credentials again! 🔄")
-
-            with gr.Column(visible=False, elem_classes="admin-panel") as admin_panel:
-                with gr.Column() as upload_section:
-                    gr.Markdown("### Share Your Knowledge 📚")
-                    upload_file = gr.File(label="Choose a Document to Share ✨")
-                    with gr.Row():
-                        with gr.Column(scale=4):
-                            upload_status = gr.Markdown()
-                        with gr.Column(scale=1):
-                            with gr.Row():
-                                upload_button = gr.Button("Process ✨", elem_classes="primary-btn")
-
-                with gr.Column() as document_section:
-                    with gr.Row():
-                        gr.Markdown("### Our Knowledge Collection 📚")
-                    with gr.Row():
-                        refresh_btn = gr.Button("🔄 Refresh List", elem_classes="primary-btn", scale=0)
-                    document_list = gr.Dataframe(
-                            headers=["Name", "Type", "Date", "Actions"],
-                            label="",
-                            value=[],
-                            interactive=False,
-                            wrap=True,
-                            row_count=(5, "fixed")
+                    with gr.Row(elem_classes="input-row"):
+                        txt = gr.Textbox(
+                            placeholder="Share your thoughts or questions about LPU! 💭",
+                            scale=8,
+                            show_label=False,
+                            container=False
                         )
-
-        gr.HTML("""
-            <div class="footer">
-                <p>Your Friendly AI Guide by Raj | © 2025 Lovely Professional University - Think Big 🌟</p>
-            </div>
-        """)
-
-    txt.submit(user_message, [txt, chatbot], [txt, chatbot])
-    submit_btn.click(user_message, [txt, chatbot], [txt, chatbot])
-    clear_btn.click(lambda: (None, None), None, [chatbot, txt], queue=False)
-
-    login_button.click(
-        admin_login,
-        inputs=[username, password],
-        outputs=[token_state, admin_panel, login_error]
-    )
-
-    upload_button.click(
-        process_file,
-        inputs=[upload_file, token_state],
-        outputs=[upload_status, document_list],
-        show_progress="full"
-    )
-
-    document_list.select(
-        delete_document,
-        inputs=[token_state, document_list],
-        outputs=[upload_status, document_list]
-    )
-
-    def refresh_documents(token):
-        """Refresh the list of documents"""
-        if not verify_token(token):
-            return None
-        return [[doc['filename'], doc['file_type'], 
-                doc['upload_date'][:16].replace('T', ' '), 
-                "🗑️ Delete"] 
-               for doc in db_handler.list_documents()]
-
-    refresh_btn.click(
-        refresh_documents,
-        inputs=[token_state],
-        outputs=[document_list]
+                        submit_btn = gr.Button("Let's Chat! 💫", elem_classes="primary-btn", scale=1)
+                    clear_btn = gr.Button("Start Fresh ✨", size="sm", elem_classes="clear-btn")
+
+            with gr.Tab("Admin"):
+                with gr.Column(elem_classes="admin-panel") as login_column:
+                    username = gr.Textbox(label="Username", placeholder="Enter your username ✨")
+                    password = gr.Textbox(label="Password", type="password", placeholder="Enter your password 🔒")
+                    login_button = gr.Button("Log In ✨", elem_classes="primary-btn")
+                    login_error = gr.Markdown(visible=False, value="Let's try those credentials again! 🔄")
+
+                with gr.Column(visible=False, elem_classes="admin-panel") as admin_panel:
+                    with gr.Column() as upload_section:
+                        gr.Markdown("### Share Your Knowledge 📚")
+                        upload_file = gr.File(label="Choose a Document to Share ✨")
+                        with gr.Row():
+                            with gr.Column(scale=4):
+                                upload_status = gr.Markdown()
+                            with gr.Column(scale=1):
+                                with gr.Row():
+                                    upload_button = gr.Button("Process ✨", elem_classes="primary-btn")
+
+                    with gr.Column() as document_section:
+                        with gr.Row():
+                            gr.Markdown("### Our Knowledge Collection 📚")
+                        with gr.Row():
+                            refresh_btn = gr.Button("🔄 Refresh List", elem_classes="primary-btn", scale=0)
+                            document_page = gr.Number(label="Page", value=1, minimum=1, precision=0, scale=0)
+                        document_list = gr.Dataframe(
+                                headers=["Name", "Type", "Date", "Actions"],
+                                label="",
+                                value=[],
+                                interactive=False,
+                                wrap=True,
+                                type="array",
+                                row_count=(5, "fixed")
+                            )
+
+            gr.HTML("""
+                <div class="footer">
+                    <p>Your Friendly AI Guide by Raj | © 2025 Lovely Professional University - Think Big 🌟</p>
+                </div>
+            """)
+
+        txt.submit(user_message, [txt, chatbot, recent_messages_state], [txt, chatbot, recent_messages_state],
+                   concurrency_limit=GEMINI_MAX_INFLIGHT, concurrency_id="chat")
+        submit_btn.click(user_message, [txt, chatbot, recent_messages_state], [txt, chatbot, recent_messages_state],
+                         concurrency_limit=GEMINI_MAX_INFLIGHT, concurrency_id="chat")
+        clear_btn.click(lambda: (None, None, deque(maxlen=CHAT_CONTEXT_MESSAGES)), None,
+                        [chatbot, txt, recent_messages_state], queue=False)
+
+        # Runs inside Gradio's event loop, so the async Gemini client it primes is the one chat() uses
+        app.load(warm_up, show_progress="hidden")
+
+        login_button.click(
+            admin_login,
+            inputs=[username, password],
+            outputs=[token_state, admin_panel, login_error]
+        )
+
+        def refresh_documents(token, page):
+            """Refresh the list of documents"""
+            if not verify_token(token):
+                return None, []
+            return document_table(page)
+
+        upload_button.click(
+            process_file,
+            inputs=[upload_file, token_state],
+            outputs=[upload_status],
+            show_progress="full"
+        ).then(
+            refresh_documents,
+            inputs=[token_state, document_page],
+            outputs=[document_list, document_ids_state],
+            show_progress="hidden"
+        )
+
+        document_list.select(
+            delete_document,
+            inputs=[token_state, document_list, document_ids_state, document_page],
+            outputs=[upload_status, document_list, document_ids_state]
+        )
+
+        refresh_btn.click(
+            refresh_documents,
+            inputs=[token_state, document_page],
+            outputs=[document_list, document_ids_state]
+        )
+
+        document_page.change(
+            refresh_documents,
+            inputs=[token_state, document_page],
+            outputs=[document_list, document_ids_state],
+            show_progress="hidden"
+        )
+
+    return app
+
+def main():
+    """Create the shared components and launch the app"""
+    global doc_processor, db_handler, model
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+    genai.configure(api_key=GEMINI_API_KEY)
+    doc_processor = DocumentProcessor(GEMINI_API_KEY)
+    db_handler = DatabaseHandler()
+    model = genai.GenerativeModel(
+        model_name="gemini-1.5-flash-8b",
+        generation_config=generation_config,
+        safety_settings=safety_settings
     )
+    build_app().launch(server_name="0.0.0.0", server_port=7860, share=True)
 
 if __name__ == "__main__":
-    app.launch(server_name="0.0.0.0", server_port=7860, share=True)
+    main()
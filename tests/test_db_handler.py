@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from utils.db_handler import DatabaseHandler
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+def _vectors(rng, n: int) -> np.ndarray:
+    """Random embeddings of Gemini's dimension"""
+    return rng.standard_normal((n, 768)).astype('float32')
+
+def _add(db, doc_id: str, vectors: np.ndarray):
+    """Store a document with one chunk per vector"""
+    chunks = [f"{doc_id} chunk {i}" for i in range(len(vectors))]
+    metadata = {"filename": f"{doc_id}.txt", "file_type": "txt", "upload_date": "2025-01-01T10:00:00"}
+    # add_document normalizes in place, so keep the caller's vectors intact for querying
+    assert db.add_document(doc_id, f"{doc_id} text", chunks, vectors.copy(), metadata)
+
+@pytest.mark.parametrize("index_factory", ["HNSW32_SQ8", "IVF4,Flat"])
+def test_flat_index_is_replaced_by_trained_index(tmp_path, rng, index_factory):
+    db = DatabaseHandler(str(tmp_path / "db"), index_factory=index_factory)
+    db.min_train_vectors = 200
+    first, second = _vectors(rng, 150), _vectors(rng, 100)
+
+    _add(db, "a", first)
+    assert db._awaiting_training()
+    assert db.query_similar(first[7], n_results=1)[0]['text'] == "a chunk 7"
+
+    _add(db, "b", second)
+    assert not db._awaiting_training()
+    assert db.index.ntotal == 250
+    assert db.query_similar(first[7], n_results=1)[0]['text'] == "a chunk 7"
+    assert db.query_similar(second[42], n_results=1)[0]['text'] == "b chunk 42"
+
+    # The trained index survives a restart
+    assert db.persist()
+    reloaded = DatabaseHandler(str(tmp_path / "db"), index_factory=index_factory)
+    assert not reloaded._awaiting_training()
+    assert reloaded.query_similar(second[42], n_results=1)[0]['text'] == "b chunk 42"
+
+@pytest.mark.parametrize("index_factory", ["HNSW32_SQ8", "IVF4,Flat"])
+def test_deleted_documents_are_not_returned(tmp_path, rng, index_factory):
+    db = DatabaseHandler(str(tmp_path / "db"), index_factory=index_factory)
+    db.min_train_vectors = 200
+    first, second = _vectors(rng, 150), _vectors(rng, 100)
+    _add(db, "a", first)
+    _add(db, "b", second)
+
+    assert db.delete_document("a")
+    results = db.query_similar(first[7], n_results=5)
+    # Results are chunks, so several may come from the same document
+    assert len(results) == 5
+    assert {result['id'] for result in results} == {"b"}
+    assert db.query_similar(second[3], n_results=1)[0]['text'] == "b chunk 3"
+
+def test_chunks_without_text_stand_in_for_their_document_once(tmp_path, rng):
+    db = DatabaseHandler(str(tmp_path / "db"))
+    vectors = _vectors(rng, 20)
+    _add(db, "a", vectors[:10])
+    _add(db, "b", vectors[10:])
+    # Chunks migrated from the pickle store have no text of their own
+    db.conn.execute("UPDATE chunks SET text = NULL WHERE doc_id = 'a'")
+    db._update_legacy_chunks()
+
+    results = db.query_similar(vectors[0], n_results=5)
+    assert results[0]['text'] == "a text"
+    assert [result['id'] for result in results].count("a") == 1
+    assert len(results) == 5
+
+    assert db.delete_document("a")
+    assert not db._has_legacy_chunks
+    assert len(db.query_similar(vectors[0], n_results=5)) == 5
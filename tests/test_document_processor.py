@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from utils.document_processor import DocumentProcessor
+
+@pytest.fixture
+def processor(tmp_path):
+    """A document processor whose embedding cache lives in the test's directory"""
+    return DocumentProcessor("test-key", cache_path=str(tmp_path / "embedding_cache.db"))
+
+def _write(tmp_path, name: str, content: str):
+    """Write a UTF-8 file into the test's directory and return its path"""
+    path = tmp_path / name
+    path.write_text(content, encoding='utf-8')
+    return path
+
+def test_markdown_strips_syntax(processor, tmp_path):
+    path = _write(tmp_path, "doc.md", (
+        "# Title\n"
+        "Some **bold**, *italic*, ***both***, ~~struck~~ and __underlined__ words.\n"
+        "- [a link](https://example.com) and ![an image](image.png)\n"
+        "> quoted <span class=\"note\">tag</span><br/><!-- hidden -->\n"
+        "---\n"
+    ))
+    assert processor._extract_from_markdown(path) == (
+        "Title\n"
+        "Some bold, italic, both, struck and underlined words.\n"
+        "a link and an image\n"
+        "quoted tag\n"
+    )
+
+def test_markdown_keeps_plain_text(processor, tmp_path):
+    text = "If a < b and c > d then 5 * 3 = 15, 2 * 4 = 8 and snake_case_name stays.\n"
+    assert processor._extract_from_markdown(_write(tmp_path, "doc.md", text)) == text
+
+def test_markdown_keeps_code(processor, tmp_path):
+    path = _write(tmp_path, "doc.md", (
+        "Use `a * b` or ``x`y`` here.\n"
+        "```python\n"
+        "# a comment, not a heading\n"
+        "total = a * b  # **not bold** <not a tag>\n"
+        "```\n"
+        "~~~\n"
+        "unterminated ~~fence~~\n"
+    ))
+    assert processor._extract_from_markdown(path) == (
+        "Use a * b or x`y here.\n"
+        "# a comment, not a heading\n"
+        "total = a * b  # **not bold** <not a tag>\n"
+        "\n"
+        "unterminated ~~fence~~\n"
+    )
+
+def test_json_is_pretty_printed(processor, tmp_path):
+    path = _write(tmp_path, "doc.json", '{"name": "LPU", "years": [2005, 2025]}')
+    assert processor._extract_from_json(path) == json.dumps({"name": "LPU", "years": [2005, 2025]}, indent=2)
+
+def test_json_falls_back_for_values_orjson_rejects(processor, tmp_path):
+    path = _write(tmp_path, "doc.json", '{"id": 123456789012345678901234567890, "score": NaN, "max": Infinity}')
+    assert processor._extract_from_json(path) == (
+        '{\n  "id": 123456789012345678901234567890,\n  "score": NaN,\n  "max": Infinity\n}'
+    )
+
+def test_json_rejects_invalid_documents(processor, tmp_path):
+    with pytest.raises(ValueError):
+        processor._extract_from_json(_write(tmp_path, "doc.json", '{"name": '))
+
+def test_read_text_of_empty_file(processor, tmp_path):
+    assert processor._read_text(_write(tmp_path, "empty.txt", "")) == ""
+
+def test_read_text_decodes_utf8(processor, tmp_path):
+    text = "Namaste! नमस्ते 🎓\nSecond line\n"
+    assert processor._read_text(_write(tmp_path, "doc.txt", text)) == text
+
+def test_embedded_pairs_drop_failed_chunks(processor):
+    chunks, vectors = processor._embedded_pairs(["a", "b", "c"], [[1.0, 2.0], None, [3.0, 4.0]])
+    assert chunks == ["a", "c"]
+    assert vectors.dtype == np.float32 and vectors.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(vectors, [[1.0, 2.0], [3.0, 4.0]])
+
+def test_embedded_pairs_when_every_embedding_fails(processor):
+    chunks, vectors = processor._embedded_pairs(["a", "b"], [None, None])
+    assert chunks == [] and len(vectors) == 0
+
+def test_embeddings_stay_aligned_with_chunks_when_requests_fail(processor, monkeypatch):
+    async def embed_batch(batch, semaphore):
+        # Chunks starting with "bad" fail, as a per-chunk fallback would report them
+        return [None if chunk.startswith("bad") else [float(len(chunk)), 1.0] for chunk in batch]
+
+    monkeypatch.setattr(processor, "_embed_batch_async", embed_batch)
+    processor.embedding_batch_size = 2
+    text = " ".join(["good" * 300, "bad" * 300, "fine" * 200, "bad" * 100])
+    chunks, vectors = asyncio.run(processor.get_embeddings_async(text, use_cache=False))
+    assert chunks == ["good" * 300, "fine" * 200]
+    np.testing.assert_array_equal(vectors, [[1200.0, 1.0], [800.0, 1.0]])
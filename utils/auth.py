@@ -1,11 +1,17 @@
 import os
+import time
+import bcrypt
 import jwt
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import lru_cache, wraps
 
-# In a production environment, use a secure secret key stored in environment variables
-SECRET_KEY = "your-secret-key-here"  # Change this in production
-ADMIN_PASSWORD = "admin123"  # Change this in production
+# Secrets come from the environment so they never live in source control
+SECRET_KEY = os.getenv("JWT_SECRET")
+if not SECRET_KEY:
+    raise ValueError("JWT_SECRET not found in environment variables")
+ADMIN_HASH = os.getenv("ADMIN_BCRYPT", "").encode('utf-8')  # bcrypt hash of the admin password
+if not ADMIN_HASH:
+    raise ValueError("ADMIN_BCRYPT not found in environment variables")
 
 def create_token():
     """Create a JWT token for admin authentication"""
@@ -16,14 +22,24 @@ def create_token():
         algorithm="HS256"
     )
 
+@lru_cache(maxsize=1024)
+def _token_expiry(token) -> float:
+    """Decode a JWT token once and return its expiry timestamp; invalid tokens raise and are not cached"""
+    return jwt.decode(token, SECRET_KEY, algorithms=["HS256"], options={"require": ["exp"]})["exp"]
+
 def verify_token(token):
     """Verify the JWT token"""
     try:
-        jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return True
-    except:
+        # A cached token still has to be unexpired, so expiry is checked on every call
+        return _token_expiry(token) > time.time()
+    except (jwt.InvalidTokenError, TypeError):
         return False
 
 def check_password(password):
-    """Check if the provided password matches the admin password"""
-    return password == ADMIN_PASSWORD
+    """Check if the provided password matches the admin password hash"""
+    try:
+        # checkpw compares in constant time, so response timing reveals nothing about the password
+        return bcrypt.checkpw((password or "").encode('utf-8'), ADMIN_HASH)
+    except ValueError as e:
+        print(f"Error checking password, is ADMIN_BCRYPT a valid bcrypt hash? {e}")
+        return False
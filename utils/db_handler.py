@@ -1,57 +1,331 @@
+import atexit
 import faiss
 import numpy as np
+import orjson
 import pickle
+import sqlite3
+import threading
+import time
 import os
 from pathlib import Path
 from datetime import datetime
 
 class DatabaseHandler:
-    def __init__(self, persist_directory: str = "vector_db"):
+    def __init__(self, persist_directory: str = "vector_db", index_factory: str = "HNSW32_SQ8"):
         """Initialize the FAISS index and storage"""
         self.persist_directory = Path(persist_directory)
         self.persist_directory.mkdir(parents=True, exist_ok=True)
-        
+
         self.index_path = self.persist_directory / "faiss.index"
-        self.metadata_path = self.persist_directory / "metadata.pkl"
-        
+        self.metadata_path = self.persist_directory / "metadata.pkl"  # Legacy store, migrated on first load
+        self.db_path = self.persist_directory / "meta.db"
+
         # Initialize or load the FAISS index
         self.dimension = 768  # Gemini's embedding dimension
+        # FAISS factory string for new indexes: the default is an HNSW graph over 8-bit codes;
+        # "IVF256,PQ16" suits large collections
+        self.index_factory = index_factory
+        # Index types that need training hold vectors in a flat index until this many exist,
+        # then are trained on all of them
+        self.min_train_vectors = 5000
+        self.ef_construction = 200  # HNSW build-time candidate list size
+        self.ef_search = 64  # HNSW query-time candidate list size
+        self.nprobe = 16  # IVF lists visited per query
+        # Hits fetched per result while chunks with NULL text remain; those were migrated without their own
+        # text and collapse to one result per document. Chunks with text are never deduplicated
+        self.oversample = 8
+        self.max_deleted_fraction = 0.25  # Compact HNSW indexes once this share of vectors is deleted
+        self.persist_delay = 5.0  # Seconds to collect further changes before writing the index
+        self._needs_training = not self._new_index().is_trained
+        self._training = False  # Set while a trained index is being built from the flat stand-in
+
+        # Document metadata lives in SQLite so each change is a few row writes
+        migrate_pickle = not self.db_path.exists() and self.metadata_path.exists()
+        self._lock = threading.RLock()  # Guards the SQLite connection and index mutation
+        self._persist_lock = threading.RLock()  # Lets one index write run at a time, in snapshot order
+        self.conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                faiss_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doc_id TEXT NOT NULL,
+                text TEXT
+            );
+            CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id);
+        """)
+
+        self._dirty = threading.Event()  # Set while index changes are waiting to be written
+
         if self.index_path.exists():
             self.index = faiss.read_index(str(self.index_path))
-            with open(self.metadata_path, 'rb') as f:
-                self.metadata = pickle.load(f)
+            if migrate_pickle:
+                self._migrate_pickle()
+        else:
+            self.index = self._build_index(np.zeros((0, self.dimension), dtype='float32'), np.zeros(0, dtype='int64'))
+        self._reconcile()
+        self._update_legacy_chunks()
+
+        # Index writes happen on a background thread, debounced, so requests never wait on disk
+        threading.Thread(target=self._persist_loop, daemon=True).start()
+        atexit.register(self._flush)
+
+        # Let FAISS use all but one core, leaving one for the event loop, unless the host sets OpenMP threads itself
+        if "OMP_NUM_THREADS" not in os.environ:
+            faiss.omp_set_num_threads(max(1, (os.cpu_count() or 1) - 1))
+
+    def _persist_loop(self):
+        """Write the index shortly after it changes, folding bursts of changes into one write"""
+        while True:
+            self._dirty.wait()
+            time.sleep(self.persist_delay)
+            self.persist()
+
+    def _flush(self):
+        """Write any pending index changes before the process exits"""
+        # Taking the write lock waits out a write already in progress on the persist thread
+        with self._persist_lock:
+            if self._dirty.is_set():
+                self.persist()
+
+    def _index_ids(self) -> np.ndarray:
+        """Return the ids of all vectors held by the index"""
+        if isinstance(self.index, faiss.IndexIDMap2):
+            return faiss.vector_to_array(self.index.id_map)
+        invlists = faiss.try_extract_index_ivf(self.index).invlists
+        ids = [faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+               for list_no in range(invlists.nlist) if invlists.list_size(list_no)]
+        return np.concatenate(ids) if ids else np.zeros(0, dtype='int64')
+
+    def _update_legacy_chunks(self):
+        """Record whether any chunks migrated without their own text are still stored"""
+        with self._lock:
+            self._has_legacy_chunks = self.conn.execute("SELECT 1 FROM chunks WHERE text IS NULL LIMIT 1").fetchone() is not None
+
+    def _reconcile(self):
+        """Flag documents whose vectors never reached the saved index, e.g. after a crash before a write"""
+        with self._lock:
+            rows = self.conn.execute("SELECT faiss_id, doc_id FROM chunks").fetchall()
+            if not rows:
+                return
+            chunk_ids = np.array([row[0] for row in rows], dtype='int64')
+            missing = ~np.isin(chunk_ids, self._index_ids())
+            orphans = sorted({rows[i][1] for i in np.flatnonzero(missing)})
+            if orphans:
+                placeholders = ",".join("?" * len(orphans))
+                names = [row[0] for row in self.conn.execute(
+                    f"SELECT json_extract(metadata, '$.filename') FROM documents WHERE id IN ({placeholders})", orphans
+                )]
+                # Only the chunk rows without vectors go; each document keeps its text and is listed
+                # as needing another upload
+                self.conn.execute("BEGIN")
+                self.conn.executemany("DELETE FROM chunks WHERE faiss_id = ?", [(faiss_id,) for faiss_id in chunk_ids[missing].tolist()])
+                self.conn.execute(
+                    f"UPDATE documents SET metadata = json_set(metadata, '$.needs_reupload', json('true')) WHERE id IN ({placeholders})",
+                    orphans
+                )
+                self.conn.execute("COMMIT")
+                print(f"Warning: {len(orphans)} documents are missing from the saved index and need to be uploaded again: {names}")
+
+            # Vectors of documents deleted after the last write come back as tombstones
+            if self._deleted_count() > self.max_deleted_fraction * self.index.ntotal:
+                self._rebuild()
+                self._dirty.set()
+
+    def _new_index(self):
+        """Create an empty FAISS index of the configured type that accepts explicit ids"""
+        # Vectors are L2-normalized, so inner product ranks by cosine similarity
+        index = faiss.index_factory(self.dimension, self.index_factory, faiss.METRIC_INNER_PRODUCT)
+        if hasattr(index, 'hnsw'):
+            index.hnsw.efConstruction = self.ef_construction
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            # IVF stores ids itself; a hashtable direct map keeps reconstruct() and remove_ids() working
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            return index
+        return faiss.IndexIDMap2(index)
+
+    def _build_index(self, vectors: np.ndarray, ids: np.ndarray):
+        """Create a new index holding the given vectors under the given ids"""
+        index = self._new_index()
+        if not index.is_trained and len(ids) < self.min_train_vectors:
+            # A quantizer trained on a handful of vectors loses most of its precision, so stay exact until enough exist
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        if len(ids):
+            vectors = self._normalize(vectors)
+            if not index.is_trained:
+                index.train(vectors)
+            index.add_with_ids(vectors, ids)
+        return index
+
+    def _awaiting_training(self) -> bool:
+        """Return True while vectors sit in the flat stand-in for an index type that needs training"""
+        return self._needs_training and isinstance(self._base_index(), faiss.IndexFlat)
+
+    def _normalize(self, vectors, copy: bool = True) -> np.ndarray:
+        """Return the vectors as unit-length float32, normalizing a float32 array in place when copy is False"""
+        if copy:
+            vectors = np.array(vectors, dtype='float32', order='C', ndmin=2)
         else:
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.metadata = {
-                'documents': {},  # Document text and metadata
-                'id_map': []     # Map FAISS ids to document ids
-            }
-
-    def add_document(self, document_id: str, text: str, embeddings: list, metadata: dict):
-        """Add a document and its embeddings to the database"""
+            vectors = np.atleast_2d(np.ascontiguousarray(vectors, dtype='float32'))
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def _base_index(self):
+        """Return the index wrapped by IndexIDMap2, or the index itself"""
+        if isinstance(self.index, faiss.IndexIDMap2):
+            return faiss.downcast_index(self.index.index)
+        return self.index
+
+    def _migrate_pickle(self):
+        """Move documents from the legacy pickle store into SQLite"""
+        with open(self.metadata_path, 'rb') as f:
+            metadata = pickle.load(f)
+
+        if isinstance(metadata['id_map'], list):
+            # Oldest format: FAISS ids were positions in the index, so give them stable ids
+            ntotal = self.index.ntotal
+            vectors = self.index.reconstruct_n(0, ntotal) if ntotal else np.zeros((0, self.dimension), dtype='float32')
+            self.index = self._build_index(vectors, np.arange(ntotal, dtype='int64'))
+            id_map = dict(enumerate(metadata['id_map']))
+        else:
+            id_map = metadata['id_map']
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO documents (id, text, metadata) VALUES (?, ?, ?)",
+                [(doc_id, info['text'], orjson.dumps(info['metadata']).decode('utf-8')) for doc_id, info in metadata['documents'].items()]
+            )
+            self.conn.executemany("INSERT INTO chunks (faiss_id, doc_id) VALUES (?, ?)", id_map.items())
+            # Never hand out an id that may still sit in the index as a deleted HNSW vector
+            last_id = max(metadata.get('next_id', 0) - 1, self.index.ntotal - 1)
+            self._reserve_ids(last_id)
+            self.conn.execute("COMMIT")
+
+        if self.index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            self._rebuild()
+        self.persist()
+
+    def _reserve_ids(self, last_id: int):
+        """Make sure new chunk ids start after last_id"""
+        updated = self.conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'chunks'", (last_id,)
+        ).rowcount
+        if not updated and last_id >= 0:
+            self.conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('chunks', ?)", (last_id,))
+
+    def _live_ids(self) -> np.ndarray:
+        """Return the FAISS ids of chunks that belong to stored documents"""
+        with self._lock:
+            rows = self.conn.execute("SELECT faiss_id FROM chunks").fetchall()
+        return np.array([row[0] for row in rows], dtype='int64')
+
+    def _deleted_count(self) -> int:
+        """Return the number of deleted vectors still held by an HNSW graph"""
+        with self._lock:
+            live = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        return max(self.index.ntotal - live, 0)
+
+    def _rebuild(self):
+        """Rebuild the index of the configured type from the vectors of live documents"""
+        live_ids = self._live_ids()
+        if isinstance(self.index, faiss.IndexIDMap2):
+            base = self._base_index()
+            ids = faiss.vector_to_array(self.index.id_map)
+            live = np.isin(ids, live_ids)
+            vectors, live_ids = base.reconstruct_n(0, base.ntotal)[live], ids[live]
+        elif len(live_ids):
+            vectors = np.vstack([self.index.reconstruct(int(faiss_id)) for faiss_id in live_ids])
+        else:
+            vectors = np.zeros((0, self.dimension), dtype='float32')
+        self.index = self._build_index(vectors, live_ids)
+
+    def _train_index(self):
+        """Replace the flat stand-in with a trained index, training on a snapshot outside the lock"""
         try:
-            # Convert embeddings to numpy array
-            embeddings_array = np.array(embeddings).astype('float32')
-            
-            # Add embeddings to FAISS index
-            self.index.add(embeddings_array)
-            
-            # Store document metadata
-            start_idx = len(self.metadata['id_map'])
-            for i in range(len(embeddings)):
-                self.metadata['id_map'].append(document_id)
-            
-            # Store document information
-            self.metadata['documents'][document_id] = {
-                'text': text,
-                'metadata': metadata,
-                'chunk_indices': list(range(start_idx, start_idx + len(embeddings)))
-            }
-            
+            with self._lock:
+                snapshot_ids = faiss.vector_to_array(self.index.id_map)
+                vectors = self._base_index().reconstruct_n(0, self.index.ntotal)
+            index = self._build_index(vectors, snapshot_ids)
+
+            with self._lock:
+                # Carry over chunks added and deleted while training
+                ids = faiss.vector_to_array(self.index.id_map)
+                added = ~np.isin(ids, snapshot_ids)
+                if added.any():
+                    index.add_with_ids(self._base_index().reconstruct_n(0, self.index.ntotal)[added], ids[added])
+                removed = snapshot_ids[~np.isin(snapshot_ids, ids)]
+                if len(removed):
+                    try:
+                        index.remove_ids(removed)
+                    except RuntimeError:
+                        pass  # Left in the HNSW graph as deleted vectors, like any other delete
+                self.index = index
+            self._dirty.set()
+        except Exception as e:
+            print(f"Error training index: {e}")
+        finally:
+            self._training = False
+
+    def _set_search_params(self, n_results: int):
+        """Apply query-time parameters for the current index type"""
+        base = self._base_index()
+        if hasattr(base, 'hnsw'):
+            base.hnsw.efSearch = max(self.ef_search, n_results)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+
+    def add_document(self, document_id: str, text: str, chunks: list, embeddings: np.ndarray, metadata: dict):
+        """Add a document, its chunks and their embeddings to the database"""
+        try:
+            if len(chunks) != len(embeddings):
+                raise ValueError(f"{len(chunks)} chunks but {len(embeddings)} embeddings")
+            if not len(chunks):
+                raise ValueError("document has no chunks")
+
+            # Normalize the (n_chunks, dimension) float32 array in place rather than copying it
+            embeddings_array = self._normalize(embeddings, copy=False)
+
+            with self._lock:
+                self.conn.execute("BEGIN")
+                try:
+                    # Store document information and each chunk's text under its FAISS id
+                    self.conn.execute(
+                        "INSERT INTO documents (id, text, metadata) VALUES (?, ?, ?)",
+                        (document_id, text, orjson.dumps(metadata).decode('utf-8'))
+                    )
+                    row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'chunks'").fetchone()
+                    start_id = row[0] + 1 if row else 0
+                    ids = np.arange(start_id, start_id + len(embeddings), dtype='int64')
+                    self.conn.executemany(
+                        "INSERT INTO chunks (faiss_id, doc_id, text) VALUES (?, ?, ?)",
+                        [(faiss_id, document_id, chunk) for faiss_id, chunk in zip(ids.tolist(), chunks)]
+                    )
+
+                    # Add embeddings to FAISS index
+                    self.index.add_with_ids(embeddings_array, ids)
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+
+                train = not self._training and self._awaiting_training() and self.index.ntotal >= self.min_train_vectors
+                self._training = self._training or train
+
             # Persist changes
-            self.persist()
+            self._dirty.set()
+            if train:
+                # Enough vectors to train the configured index on the collection itself
+                self._train_index()
             return True
-            
+
         except Exception as e:
             print(f"Error adding document to database: {e}")
             return False
@@ -59,34 +333,58 @@ class DatabaseHandler:
     def query_similar(self, query_embedding: list, n_results: int = 5) -> list:
         """Query the database for similar documents"""
         try:
-            # Convert query embedding to numpy array
-            query_array = np.array([query_embedding]).astype('float32')
-            
-            # Search the FAISS index
-            D, I = self.index.search(query_array, n_results)
-            
+            # Convert query embedding to a normalized numpy array
+            query_array = self._normalize([query_embedding])
+
+            # One locked section covers the search and the row lookup, so a concurrent delete cannot change
+            # the oversampling between choosing k and reading the chunks it found
+            with self._lock:
+                # Search the FAISS index, fetching extra hits to make up for deleted vectors still in the graph;
+                # migrated chunks collapse to one result per document, so oversample while any remain
+                wanted = n_results * self.oversample if self._has_legacy_chunks else n_results
+                k = min(wanted + self._deleted_count(), self.index.ntotal) or n_results
+                self._set_search_params(k)
+                D, I = self.index.search(query_array, k)
+
+                hits = [int(idx) for idx in I[0] if idx >= 0]
+                if not hits:
+                    return []
+
+                placeholders = ",".join("?" * len(hits))
+                rows = self.conn.execute(
+                    f"SELECT c.faiss_id, c.doc_id, c.text IS NULL, COALESCE(c.text, d.text), d.metadata FROM chunks c "
+                    f"JOIN documents d ON d.id = c.doc_id WHERE c.faiss_id IN ({placeholders})",
+                    hits
+                ).fetchall()
+            chunk_rows = {row[0]: row[1:] for row in rows}
+
             results = []
-            seen_docs = set()
-            
-            # Get unique documents from the results
-            for idx in I[0]:
-                if idx >= len(self.metadata['id_map']):
-                    continue
-                    
-                doc_id = self.metadata['id_map'][idx]
-                if doc_id in seen_docs:
+            legacy_docs = set()
+            metadata_cache = {}
+
+            # Return the matching chunks in FAISS rank order
+            for idx in hits:
+                if idx not in chunk_rows:
                     continue
-                
-                seen_docs.add(doc_id)
-                doc_info = self.metadata['documents'][doc_id]
+                doc_id, legacy, text, doc_metadata = chunk_rows[idx]
+                if legacy:
+                    # Chunks stored without their own text stand in for the whole document once
+                    if doc_id in legacy_docs:
+                        continue
+                    legacy_docs.add(doc_id)
+
+                if doc_id not in metadata_cache:
+                    metadata_cache[doc_id] = orjson.loads(doc_metadata)
                 results.append({
                     'id': doc_id,
-                    'text': doc_info['text'],
-                    'metadata': doc_info['metadata']
+                    'text': text,
+                    'metadata': metadata_cache[doc_id]
                 })
-            
+                if len(results) == n_results:
+                    break
+
             return results
-            
+
         except Exception as e:
             print(f"Error querying database: {e}")
             return []
@@ -94,65 +392,63 @@ class DatabaseHandler:
     def delete_document(self, document_id: str) -> bool:
         """Delete a document from the database"""
         try:
-            if document_id not in self.metadata['documents']:
-                return False
-            
-            # Get indices to remove
-            indices_to_remove = set(self.metadata['documents'][document_id]['chunk_indices'])
-            
-            # Create a new index
-            new_index = faiss.IndexFlatL2(self.dimension)
-            
-            # Get all vectors
-            vectors = self.index.reconstruct_n(0, self.index.ntotal)
-            
-            # Create new metadata
-            new_metadata = {
-                'documents': {},
-                'id_map': []
-            }
-            
-            # Add vectors and update metadata, skipping the deleted document
-            current_idx = 0
-            for old_idx in range(len(self.metadata['id_map'])):
-                if old_idx not in indices_to_remove:
-                    doc_id = self.metadata['id_map'][old_idx]
-                    new_index.add(vectors[old_idx:old_idx+1])
-                    new_metadata['id_map'].append(doc_id)
-                    
-                    # Update document indices if needed
-                    if doc_id != document_id:
-                        if doc_id not in new_metadata['documents']:
-                            new_metadata['documents'][doc_id] = {
-                                'text': self.metadata['documents'][doc_id]['text'],
-                                'metadata': self.metadata['documents'][doc_id]['metadata'],
-                                'chunk_indices': []
-                            }
-                        new_metadata['documents'][doc_id]['chunk_indices'].append(current_idx)
-                        current_idx += 1
-            
-            # Update the instance variables
-            self.index = new_index
-            self.metadata = new_metadata
-            
+            with self._lock:
+                if not self.conn.execute("SELECT 1 FROM documents WHERE id = ?", (document_id,)).fetchone():
+                    return False
+
+                # Get ids to remove
+                rows = self.conn.execute("SELECT faiss_id FROM chunks WHERE doc_id = ?", (document_id,)).fetchall()
+                ids_to_remove = np.array([row[0] for row in rows], dtype='int64')
+
+                if len(ids_to_remove):
+                    try:
+                        self.index.remove_ids(ids_to_remove)
+                    except RuntimeError:
+                        # HNSW graphs cannot drop vectors in place; query_similar skips them until compaction
+                        pass
+
+                # Update metadata
+                self.conn.execute("BEGIN")
+                self.conn.execute("DELETE FROM chunks WHERE doc_id = ?", (document_id,))
+                self.conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+                self.conn.execute("COMMIT")
+
+                if self._deleted_count() > self.max_deleted_fraction * self.index.ntotal:
+                    self._rebuild()
+                if self._has_legacy_chunks:
+                    self._update_legacy_chunks()
+
             # Persist changes
-            self.persist()
+            self._dirty.set()
             return True
-            
+
         except Exception as e:
             print(f"Error deleting document: {e}")
             return False
 
-    def list_documents(self) -> list:
-        """List all unique documents in the database"""
+    def list_documents(self, limit: int = None, offset: int = 0) -> list:
+        """List unique documents in the database, newest first"""
         try:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT id, json_extract(metadata, '$.filename'), json_extract(metadata, '$.file_type'), "
+                    "json_extract(metadata, '$.upload_date'), json_extract(metadata, '$.display_date'), "
+                    "json_extract(metadata, '$.needs_reupload') "
+                    "FROM documents ORDER BY seq DESC LIMIT ? OFFSET ?",
+                    (-1 if limit is None else limit, offset)
+                ).fetchall()
+
             documents = []
-            for doc_id, doc_info in self.metadata['documents'].items():
+            for doc_id, filename, file_type, upload_date, display_date, needs_reupload in rows:
+                upload_date = upload_date or ''
                 documents.append({
                     'id': doc_id,
-                    'filename': doc_info['metadata'].get('filename', ''),
-                    'file_type': doc_info['metadata'].get('file_type', ''),
-                    'upload_date': doc_info['metadata'].get('upload_date', '')
+                    'filename': filename or '',
+                    'file_type': file_type or '',
+                    'upload_date': upload_date,
+                    # Documents stored before display_date existed fall back to formatting here
+                    'display_date': display_date or upload_date[:16].replace('T', ' '),
+                    'needs_reupload': bool(needs_reupload)
                 })
             return documents
         except Exception as e:
@@ -160,16 +456,22 @@ class DatabaseHandler:
             return []
 
     def persist(self):
-        """Persist the index and metadata to disk"""
-        try:
-            # Save FAISS index
-            faiss.write_index(self.index, str(self.index_path))
-            
-            # Save metadata
-            with open(self.metadata_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
-            
-            return True
-        except Exception as e:
-            print(f"Error persisting database: {e}")
-            return False
+        """Persist the index to disk; metadata is committed to SQLite as it changes"""
+        # Searches only wait for an in-memory copy of the index; the disk write happens after the lock is
+        # released, and the write lock keeps an older copy from being renamed over a newer one
+        with self._persist_lock:
+            try:
+                with self._lock:
+                    self._dirty.clear()
+                    data = faiss.serialize_index(self.index)
+
+                # Save to a temporary file and swap it in, so a crash never leaves a partial index
+                tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.index_path)
+                return True
+            except Exception as e:
+                self._dirty.set()  # Retry on the next write
+                print(f"Error persisting database: {e}")
+                return False
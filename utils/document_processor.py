@@ -1,14 +1,59 @@
+import asyncio
 import json
-import markdown2
+import mmap
+import multiprocessing
+import numpy as np
+import orjson
+import os
+import re
 from PyPDF2 import PdfReader
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from utils.embedding_cache import EmbeddingCache
+
+# Workers are forked from a single-threaded server process, never from the app with its gRPC and
+# persist threads; spawn is used where forkserver is unavailable. Either way each worker imports the
+# entry script once, so it must keep its setup behind `if __name__ == "__main__"`
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _PDF_MP_CONTEXT = multiprocessing.get_context("forkserver")
+    _PDF_MP_CONTEXT.set_forkserver_preload(["utils.document_processor"])
+else:
+    _PDF_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# Markdown syntax stripped before embedding; the markup carries no meaning for retrieval
+# Splitting on the fenced block and code span patterns yields prose, delimiter, code, prose, ...
+_MD_FENCED_RE = re.compile(r"^[ \t]*(`{3,}|~{3,})[^\n]*\n(.*?)(?:^[ \t]*\1[`~]*[ \t]*$|\Z)", re.MULTILINE | re.DOTALL)
+_MD_CODE_SPAN_RE = re.compile(r"(`+)(.+?)\1", re.DOTALL)
+_MD_RULE_RE = re.compile(r"^\s*(?:[-*_]\s*){3,}$", re.MULTILINE)
+_MD_BLOCK_RE = re.compile(r"^\s{0,3}(?:#{1,6}|>+|[-*+]|\d+[.)])[ \t]+", re.MULTILINE)
+_MD_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_HTML_RE = re.compile(
+    r"<!--.*?-->|</?[A-Za-z][A-Za-z0-9-]*"
+    r"(?:\s+[A-Za-z_:][\w:.-]*(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'=<>`]+))?)*\s*/?>",
+    re.DOTALL,
+)
+# Only delimiters that open and close around non-space text; intraword underscores are left alone
+_MD_EMPHASIS_RE = re.compile(r"(\*{1,2}|~~)(?=\S)(.+?)(?<=\S)\1|(?<!\w)(_{1,2})(?=\S)(.+?)(?<=\S)\3(?!\w)")
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> str:
+    """Extract the text of a range of PDF pages; runs in a worker process with its own reader"""
+    reader = PdfReader(path)
+    return "".join(reader.pages[i].extract_text() + "\n" for i in range(start, stop))
 
 class DocumentProcessor:
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache_path: str = "vector_db/embedding_cache.db"):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-1.5-flash-8b')
         self.embedding_model = 'models/embedding-001'  # This is still used for embeddings as FLASH-8B doesn't generate embeddings
+        self.embedding_batch_size = 100  # Maximum number of texts per batch embedding request
+        self.embedding_workers = 8  # Maximum embedding requests in flight per call, batches and single chunks alike
+        self.cache = EmbeddingCache(cache_path, namespace=f"{self.embedding_model}:retrieval_document")
+        self.pdf_workers = os.cpu_count() or 1  # Processes used to extract text from large PDFs
+        self.pdf_pages_per_worker = 8  # Minimum pages per worker; shorter PDFs are extracted in-process
+        # Started on the first large PDF and kept, so later uploads skip worker startup
+        self._pdf_executor = ProcessPoolExecutor(max_workers=self.pdf_workers, mp_context=_PDF_MP_CONTEXT)
 
     def extract_text(self, file_path: str, file_type: str) -> str:
         """Extract text content from different file types"""
@@ -28,63 +73,160 @@ class DocumentProcessor:
     def _extract_from_pdf(self, path: Path) -> str:
         """Extract text from PDF files"""
         reader = PdfReader(path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        page_count = len(reader.pages)
+        workers = min(self.pdf_workers, page_count // self.pdf_pages_per_worker)
+        if workers < 2:
+            return "".join(page.extract_text() + "\n" for page in reader.pages)
+
+        # Page extraction is pure-Python CPU work, so split page ranges across processes
+        bounds = np.linspace(0, page_count, workers + 1, dtype=int)
+        parts = self._pdf_executor.map(_extract_pdf_pages, [str(path)] * workers, bounds[:-1].tolist(), bounds[1:].tolist())
+        return "".join(parts)
 
     def _extract_from_text(self, path: Path) -> str:
         """Extract text from plain text files"""
-        return path.read_text(encoding='utf-8')
+        return self._read_text(path)
+
+    def _read_text(self, path: Path) -> str:
+        """Decode a UTF-8 file straight from a memory map, without an intermediate bytes copy"""
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""  # Empty files cannot be memory-mapped
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return str(mm, 'utf-8')
 
     def _extract_from_json(self, path: Path) -> str:
         """Extract text from JSON files"""
-        data = json.loads(path.read_text(encoding='utf-8'))
-        return json.dumps(data, indent=2)
+        raw = path.read_bytes()
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson rejects integers beyond 64 bits and NaN/Infinity, which json accepts
+            return json.dumps(json.loads(raw), indent=2)
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
 
     def _extract_from_markdown(self, path: Path) -> str:
         """Extract text from Markdown files"""
-        md_text = path.read_text(encoding='utf-8')
-        html = markdown2.markdown(md_text)
-        return html
+        parts = _MD_FENCED_RE.split(self._read_text(path))
+        # Fence lines are dropped and code block bodies kept as written
+        return "".join(
+            part if i % 3 == 2 else self._strip_markdown(part)
+            for i, part in enumerate(parts) if i % 3 != 1
+        )
+
+    def _strip_markdown(self, text: str) -> str:
+        """Strip Markdown syntax from prose outside fenced code blocks"""
+        text = _MD_RULE_RE.sub("", text)
+        text = _MD_BLOCK_RE.sub("", text)
+        parts = _MD_CODE_SPAN_RE.split(text)
+        return "".join(
+            part if i % 3 == 2 else self._strip_inline_markdown(part)
+            for i, part in enumerate(parts) if i % 3 != 1
+        )
 
-    def get_embeddings(self, text: str) -> list:
-        """Generate embeddings for the text using Gemini API"""
-        # Split text into chunks if it's too long
+    def _strip_inline_markdown(self, text: str) -> str:
+        """Strip links, HTML tags and emphasis from prose outside code spans"""
+        text = _MD_LINK_RE.sub(r"\1", text)
+        text = _MD_HTML_RE.sub("", text)
+        # A second pass unwraps nested emphasis such as ***bold italic***
+        for _ in range(2):
+            text = _MD_EMPHASIS_RE.sub(lambda m: m.group(2) or m.group(4), text)
+        return text
+
+    async def get_embeddings_async(self, text: str, use_cache: bool = True) -> tuple:
+        """Generate embeddings for the text without blocking the event loop, returning chunks and embeddings"""
         chunks = self._chunk_text(text, max_length=1000)
-        embeddings = []
-        
-        for chunk in chunks:
+        if use_cache:
+            embeddings = await asyncio.to_thread(self.cache.get_many, chunks)
+        else:
+            embeddings = [None] * len(chunks)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        batches = self._batch_chunks(missing)
+        semaphore = asyncio.Semaphore(self.embedding_workers)  # Shared by every request this call makes
+        batch_results = await asyncio.gather(*(self._embed_batch_async([chunks[i] for i in batch], semaphore) for batch in batches))
+        embedded = []
+        for batch, results in zip(batches, batch_results):
+            embedded.extend(self._store(embeddings, batch, results))
+
+        if use_cache and embedded:
+            await asyncio.to_thread(self.cache.set_many, [chunks[i] for i in embedded], [embeddings[i] for i in embedded])
+
+        return self._embedded_pairs(chunks, embeddings)
+
+    def _embedded_pairs(self, chunks: list, embeddings: list) -> tuple:
+        """Drop chunks whose embedding failed and pack the rest into one float32 array aligned with them"""
+        kept = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        dimension = len(embeddings[kept[0]]) if kept else 0
+        vectors = np.empty((len(kept), dimension), dtype=np.float32)
+        for row, i in enumerate(kept):
+            vectors[row] = embeddings[i]
+        return [chunks[i] for i in kept], vectors
+
+    def _store(self, embeddings: list, indices: list, results: list) -> list:
+        """Place new embeddings into their chunk positions, returning the positions that succeeded"""
+        embedded = []
+        for i, result in zip(indices, results):
+            if result is not None:
+                embeddings[i] = result
+                embedded.append(i)
+        return embedded
+
+    async def _embed_batch_async(self, batch: list, semaphore: asyncio.Semaphore) -> list:
+        """Embed one batch of chunks, falling back to concurrent per-chunk requests"""
+        try:
+            async with semaphore:
+                result = await genai.embed_content_async(
+                    model=self.embedding_model,
+                    content=batch,
+                    task_type="retrieval_document"
+                )
+            return result['embedding']
+        except google_exceptions.ResourceExhausted as e:
+            # Splitting a rate-limited batch into single requests would only multiply the rejected calls
+            print(f"Embedding quota exceeded, skipping batch: {e}")
+            return [None] * len(batch)
+        except Exception as e:
+            print(f"Error generating batch embedding, retrying chunks individually: {e}")
+
+        return await asyncio.gather(*(self._embed_chunk_async(chunk, semaphore) for chunk in batch))
+
+    async def _embed_chunk_async(self, chunk: str, semaphore: asyncio.Semaphore):
+        """Embed a single chunk, returning None if the request fails"""
+        async with semaphore:
             try:
-                embedding = genai.embed_content(
+                result = await genai.embed_content_async(
                     model=self.embedding_model,
                     content=chunk,
                     task_type="retrieval_document"
                 )
-                embeddings.append(embedding['embedding'])
+                return result['embedding']
             except Exception as e:
                 print(f"Error generating embedding: {e}")
-                continue
-        
-        return embeddings
+                return None
+
+    def _batch_chunks(self, chunks: list) -> list:
+        """Group chunks into batches no larger than the embedding API accepts"""
+        return [chunks[i:i + self.embedding_batch_size]
+                for i in range(0, len(chunks), self.embedding_batch_size)]
 
     def _chunk_text(self, text: str, max_length: int) -> list:
         """Split text into chunks of maximum length"""
         words = text.split()
+        if not words:
+            return []
+
+        # ends[i] is the length of words[:i + 1] joined with spaces, plus one
+        ends = np.fromiter((len(word) + 1 for word in words), dtype=np.int64, count=len(words)).cumsum()
         chunks = []
-        current_chunk = []
-        current_length = 0
-
-        for word in words:
-            if current_length + len(word) + 1 > max_length:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [word]
-                current_length = len(word)
-            else:
-                current_chunk.append(word)
-                current_length += len(word) + 1
-
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+        start = 0
+
+        while start < len(words):
+            # Find the last word that keeps the chunk within max_length with one binary search
+            offset = ends[start - 1] if start else 0
+            end = int(np.searchsorted(ends, offset + max_length + 1, side='right'))
+            end = max(end, start + 1)  # A word longer than max_length becomes its own chunk
+            chunks.append(" ".join(words[start:end]))
+            start = end
 
         return chunks
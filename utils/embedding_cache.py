@@ -0,0 +1,52 @@
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from pathlib import Path
+
+class EmbeddingCache:
+    def __init__(self, path: str = "vector_db/embedding_cache.db", namespace: str = ""):
+        """Open or create an on-disk cache of embeddings keyed by content hash"""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace  # Mixed into every key so a model change never returns stale vectors
+        self.max_params = 500  # Keys per SELECT, below SQLite's bound-parameter limit
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        """Hash a text together with the cache namespace"""
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: list) -> list:
+        """Return cached embeddings aligned with texts, with None for misses"""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        try:
+            with self._lock:
+                for start in range(0, len(keys), self.max_params):
+                    batch = keys[start:start + self.max_params]
+                    placeholders = ",".join("?" * len(batch))
+                    found.update(self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                    ))
+        except Exception as e:
+            print(f"Error reading embedding cache: {e}")
+
+        return [np.frombuffer(found[key], dtype='float32') if key in found else None for key in keys]
+
+    def set_many(self, texts: list, embeddings: list):
+        """Store embeddings for the given texts"""
+        rows = [(self._key(text), np.asarray(embedding, dtype='float32').tobytes())
+                for text, embedding in zip(texts, embeddings)]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._conn.commit()
+        except Exception as e:
+            print(f"Error writing embedding cache: {e}")
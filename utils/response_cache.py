@@ -0,0 +1,59 @@
+import numpy as np
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.97, max_entries: int = 256):
+        """Initialize an in-memory cache of responses keyed by query embedding"""
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embeddings = None  # Contiguous (max_entries, dim) matrix of normalized embeddings
+        self._responses = [None] * max_entries
+        self._last_used = np.zeros(max_entries, dtype=np.int64)  # Slot -> last access tick
+        self._size = 0
+        self._tick = 0
+
+    def _normalize(self, embedding) -> np.ndarray:
+        """L2-normalize an embedding so similarity becomes a dot product"""
+        vector = np.asarray(embedding, dtype='float32')
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _touch(self, slot: int):
+        """Mark a slot as the most recently used"""
+        self._tick += 1
+        self._last_used[slot] = self._tick
+
+    def get(self, embedding):
+        """Return a cached response whose query is similar enough, or None"""
+        if not self._size:
+            return None
+
+        # One matrix-vector product scores every cached query
+        sims = self._embeddings[:self._size] @ self._normalize(embedding)
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+
+        self._touch(best)
+        return self._responses[best]
+
+    def add(self, embedding, response: str):
+        """Store a response, evicting the least recently used entry when full"""
+        vector = self._normalize(embedding)
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.max_entries, vector.shape[0]), dtype='float32')
+
+        if self._size < self.max_entries:
+            slot = self._size
+            self._size += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+
+        self._embeddings[slot] = vector
+        self._responses[slot] = response
+        self._touch(slot)
+
+    def clear(self):
+        """Drop all cached responses"""
+        self._responses = [None] * self.max_entries
+        self._last_used[:] = 0
+        self._size = 0